@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import os
+import sys
+import json
+from solidity_parser import parse_files
+
+def print_usage():
+    print("""Usage:
+            $./batch.py <directory> [workers]
+            $python3 batch.py <directory> [workers]""")
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print_usage()
+        return
+
+    root = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) == 3 else None
+
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(".sol"):
+                paths.append(os.path.join(dirpath, filename))
+
+    for path, result, error in parse_files(sorted(paths), workers):
+        if error is not None:
+            print(json.dumps({"file": path, "error": error}))
+        else:
+            print(json.dumps({"file": path, "result": result}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import json
+from solidity_parser import Extractor, ExtractorPipeline, parse_file
+
+
+class AbiSummary(Extractor):
+    def __init__(self):
+        self.functions = []
+
+    def on_function(self, node, unit):
+        modifiers = node.get("modifiers", [])
+        if "public" in modifiers or "external" in modifiers:
+            types = [p["type"] for p in node.get("parameters", [])]
+            self.functions.append("{0}.{1}({2})".format(unit["name"], node["name"], ",".join(types)))
+
+    def result(self):
+        return {"abi": self.functions}
+
+
+class InheritanceGraph(Extractor):
+    def __init__(self):
+        self.edges = {}
+
+    def on_contract(self, node, unit):
+        self.edges[node["name"]] = node.get("inheritance", [])
+
+    def on_interface(self, node, unit):
+        self.on_contract(node, unit)
+
+    def result(self):
+        return {"inheritance": self.edges}
+
+
+class EventCatalog(Extractor):
+    def __init__(self):
+        self.events = []
+
+    def on_event(self, node, unit):
+        self.events.append({"unit": unit["name"], "name": node["name"],
+                            "parameters": node.get("parameters", [])})
+
+    def result(self):
+        return {"events": self.events}
+
+
+class StorageLayout(Extractor):
+    def __init__(self):
+        self.slots = {}
+
+    def on_variable(self, node, unit):
+        if "constant" not in node.get("modifiers", []):
+            self.slots.setdefault(unit["name"], []).append([node["type"], node.get("name")])
+
+    def on_mapping(self, node, unit):
+        self.slots.setdefault(unit["name"], []).append(["mapping", node.get("name")])
+
+    def result(self):
+        return {"storage": self.slots}
+
+
+class ModifierUsage(Extractor):
+    def __init__(self):
+        self.declared = set()
+        self.usage = {}
+
+    def on_modifier(self, node, unit):
+        self.declared.add(node["name"])
+
+    def on_function(self, node, unit):
+        for modifier in node.get("modifiers", []):
+            self.usage.setdefault(modifier, []).append("{0}.{1}".format(unit["name"], node["name"]))
+
+    def result(self):
+        # a function's modifiers list also holds visibility and mutability,
+        # keep only names declared with `modifier`
+        return {"modifiers": dict((k, v) for k, v in self.usage.items() if k in self.declared)}
+
+
+def print_usage():
+    print("""Usage:
+            $./extract.py <file>
+            $python3 extract.py <file>""")
+
+def main():
+    if len(sys.argv) != 2:
+        print_usage()
+        return
+
+    pipeline = ExtractorPipeline([AbiSummary(), InheritanceGraph(), EventCatalog(),
+                                  StorageLayout(), ModifierUsage()])
+    parse_file(sys.argv[1], pipeline=pipeline)
+    print(json.dumps(pipeline.results(), indent=4))
+
+
+if __name__ == "__main__":
+    main()
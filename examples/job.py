@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import os
+import sys
+import json
+from multiprocessing import Process
+from solidity_parser import CorpusJob
+
+def print_usage():
+    print("""Usage:
+            $./job.py <db> add <directory>
+            $./job.py <db> run [workers]
+            $./job.py <db> status
+            $./job.py <db> retry
+            $./job.py <db> dump""")
+
+def print_progress(progress):
+    print(json.dumps(progress))
+    sys.stdout.flush()
+
+def work(db_path):
+    job = CorpusJob(db_path)
+    job.run(report=print_progress)
+    job.close()
+
+def main():
+    if len(sys.argv) < 3:
+        print_usage()
+        return
+
+    db_path = sys.argv[1]
+    command = sys.argv[2]
+    job = CorpusJob(db_path)
+
+    if command == "add" and len(sys.argv) == 4:
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(sys.argv[3]):
+            for filename in filenames:
+                if filename.endswith(".sol"):
+                    paths.append(os.path.abspath(os.path.join(dirpath, filename)))
+        job.add(paths)
+        print_progress(job.progress())
+    elif command == "run":
+        workers = int(sys.argv[3]) if len(sys.argv) == 4 else os.cpu_count()
+        processes = [Process(target=work, args=(db_path,)) for i in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        print_progress(job.progress())
+    elif command == "status":
+        print_progress(job.progress())
+    elif command == "retry":
+        print("{0} failed files queued again".format(job.retry_failed()))
+    elif command == "dump":
+        for path, result in job.results():
+            print(json.dumps({"file": path, "result": result}))
+        for path, error in job.errors():
+            print(json.dumps({"file": path, "error": error}))
+    else:
+        print_usage()
+
+    job.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import sys
+import json
+from solidity_parser import Watcher
+
+def print_usage():
+    print("""Usage:
+            $./watch.py <directory> [interval]
+            $python3 watch.py <directory> [interval]""")
+
+def print_changes(changes):
+    for change in changes:
+        print(json.dumps(change))
+    sys.stdout.flush()
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print_usage()
+        return
+
+    root = sys.argv[1]
+    interval = float(sys.argv[2]) if len(sys.argv) == 3 else 1.0
+
+    watcher = Watcher(root)
+    # first poll parses the whole tree, only report what changes after it
+    watcher.poll()
+    print("watching {0} ({1} files)".format(root, len(watcher.files)))
+    try:
+        watcher.watch(print_changes, interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,16 @@
 # Author: Sphantix
 # Mail: sphantix@gmail.cn
 # created time: Tue 12 Jun 2018 09:30:45 AM CST
+import os
 import re
 import sys
 import json
+import time
+import uuid
+import socket
+import sqlite3
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 
 class ParseErrorException(Exception):
@@ -14,6 +21,21 @@ class ParseErrorException(Exception):
         Exception.__init__(self, err)
 
 
+class ParseLimitException(ParseErrorException):
+    def __init__(self, err='Parse limit exceeded!'):
+        ParseErrorException.__init__(self, err)
+
+
+class ParseLimits(object):
+    # None means unlimited; time_budget is in seconds of wall-clock time
+    def __init__(self, max_input_size=None, max_depth=None,
+                 max_tokens=None, time_budget=None):
+        self.max_input_size = max_input_size
+        self.max_depth = max_depth
+        self.max_tokens = max_tokens
+        self.time_budget = time_budget
+
+
 class Block(object):
     def __init__(self, key_word, handler):
         self.key_word = key_word
@@ -21,19 +43,24 @@ class Block(object):
 
 
 class Stack(object):
-    def __init__(self):
+    def __init__(self, max_depth=None):
         self.items = []
+        self.max_depth = max_depth
 
     def is_empty(self):
         return self.items == []
 
     def peek(self):
+        if self.is_empty():
+            return None
         return self.items[len(self.items) - 1]
 
     def depth(self):
         return len(self.items)
 
     def push(self, item):
+        if self.max_depth is not None and len(self.items) >= self.max_depth:
+            raise ParseLimitException("Nesting depth exceeds {0}".format(self.max_depth))
         self.items.append(item)
 
     def pop(self):
@@ -41,45 +68,35 @@ class Stack(object):
 
 
 class SolidityParser(object):
-    def __init__(self, content, EF):
+    # checking the clock is cheap but not free, only do it every N tokens
+    DEADLINE_CHECK_INTERVAL = 256
+
+    # units whose raw text can be looked up in unit_cache before parsing
+    CACHEABLE_UNITS = ["library", "interface", "contract"]
+    # characters between deadline checks in the unit pre-scan
+    SCAN_DEADLINE_INTERVAL = 4096
+
+    def __init__(self, content, EF, limits=None, unit_cache=None, config=None,
+                 pipeline=None):
         self.content = content
         self.EF = EF           #End Flag
-        self.stack = Stack()
-
-        self.reserve_words = ["pragma", "library", "contract", "is",
-                              "function", "event", "emit", "modifier",
-                              "return", "public", "private", "const",
-                              "external", "internal", "payable", "assert",
-                              "require", "throw", "import", "as",
-                              "indexed", "pure", "view", "memory",
-                              "storage", "calldata"]
-        self.limiter = ["(", ")", "{", "}", "[", "]"]
-        self.operations = ["==", "!=", "=", "+",
-                           "-", "*", "/", "**"]
-        self.types = ['address', 'bool', 'string', 'var', 'int', 'int8',
-                      'int16', 'int24', 'int32', 'int40', 'int48', 'int56',
-                      'int64', 'int72', 'int80', 'int88', 'int96', 'int104',
-                      'int112', 'int120', 'int128', 'int136', 'int144', 'int152',
-                      'int160', 'int168', 'int176', 'int184', 'int192', 'int200',
-                      'int208', 'int216', 'int224', 'int232', 'int240', 'int248',
-                      'int256', 'uint', 'uint8', 'uint16', 'uint24', 'uint32',
-                      'uint40', 'uint48', 'uint56', 'uint64', 'uint72', 'uint80',
-                      'uint88', 'uint96', 'uint104', 'uint112', 'uint120',
-                      'uint128', 'uint136', 'uint144', 'uint152', 'uint160',
-                      'uint168', 'uint176', 'uint184', 'uint192', 'uint200',
-                      'uint208', 'uint216', 'uint224', 'uint232', 'uint240',
-                      'uint248', 'uint256','byte', 'bytes', 'bytes1', 'bytes2',
-                      'bytes3', 'bytes4', 'bytes5', 'bytes6', 'bytes7', 'bytes8',
-                      'bytes9', 'bytes10', 'bytes11', 'bytes12', 'bytes13',
-                      'bytes14', 'bytes15', 'bytes16', 'bytes17', 'bytes18',
-                      'bytes19', 'bytes20', 'bytes21', 'bytes22', 'bytes23',
-                      'bytes24', 'bytes25', 'bytes26', 'bytes27', 'bytes28',
-                      'bytes29', 'bytes30', 'bytes31', 'bytes32']
-        self.blocks = [Block("pragma", self.handle_pragma),
-                       Block("import", self.handle_import),
-                       Block("library", self.handle_library),
-                       Block("interface", self.handle_interface),
-                       Block("contract", self.handle_contract)]
+        self.limits = limits if limits is not None else ParseLimits()
+        self.unit_cache = unit_cache   # raw text hash -> (parsed unit, members)
+        self.pipeline = pipeline       # ExtractorPipeline fed while parsing
+        self.unit = None               # unit whose body is being parsed
+        self.members = None            # (kind, member) of that unit, in source order
+        self.stack = Stack(self.limits.max_depth)
+        self.tokens = 0
+        self.deadline = None
+        self.prescan = True            # cleared once the unit pre-scan misleads
+
+        # shared, read-only tables
+        self.config = config if config is not None else DEFAULT_CONFIG
+        self.reserve_words = self.config.reserve_words
+        self.limiter = self.config.limiter
+        self.operations = self.config.operations
+        self.types = self.config.types
+        self.blocks = self.config.blocks
 
     def is_limiter(self, content):
         if content in self.limiter:
@@ -457,42 +474,52 @@ class SolidityParser(object):
                 variable, pos = self.handle_variable(pos)
                 variable["type"] = word
                 variables.append(variable)
+                self.emit("variable", variable)
             elif word == "using":
                 using, pos = self.handle_using(pos)
                 using["type"] = word
                 usings.append(using)
+                self.emit("using", using)
             elif word == "mapping":
                 mapping, pos = self.handle_mapping(pos)
                 mapping["type"] = word
                 mappings.append(mapping)
+                self.emit("mapping", mapping)
             elif word == "event":
                 event, pos = self.handle_event(pos)
                 event["type"] = word
                 events.append(event)
+                self.emit("event", event)
             elif word == "modifier":
                 modifier, pos = self.handle_modifier(pos)
                 modifier["type"] = word
                 modifiers.append(modifier)
+                self.emit("modifier", modifier)
             elif word == "function":
                 function, pos = self.handle_function(pos)
                 function["type"] = word
                 functions.append(function)
+                self.emit("function", function)
             elif word == "struct":
                 struct, pos = self.handle_struct(pos)
                 struct["type"] = word
                 structs.append(struct)
+                self.emit("struct", struct)
             elif word == "constructor":
                 constructor, pos = self.handle_constructor(pos)
                 constructor["type"] = word
                 result["constructor"] = constructor
+                self.emit("constructor", constructor)
             elif word == "enum":
                 enum, pos = self.handle_enum(pos)
                 enum["type"] = word
                 enums.append(enum)
+                self.emit("enum", enum)
             else:
                 variable, pos = self.handle_variable(pos)
                 variable["type"] = word
                 variables.append(variable)
+                self.emit("variable", variable)
 
 
         if len(functions) > 0:
@@ -566,6 +593,7 @@ class SolidityParser(object):
     def handle_library(self, pos):
         result = {}
         result["type"] = "library"
+        self.unit = result
 
         word, pos = self.get_one_word(pos)
         result["name"] = word
@@ -578,6 +606,8 @@ class SolidityParser(object):
             inheritance, pos = self.handle_inheritance(pos)
             result["inheritance"] = inheritance
             body, pos = self.handle_block_body(pos)
+        else:
+            raise ParseErrorException("Parse Error, unexpected {0} after {1}".format(word, result["name"]))
 
         result["body"] = body
 
@@ -586,6 +616,7 @@ class SolidityParser(object):
     def handle_interface(self, pos):
         result = {}
         result["type"] = "interface"
+        self.unit = result
 
         word, pos = self.get_one_word(pos)
         result["name"] = word
@@ -598,6 +629,8 @@ class SolidityParser(object):
             inheritance, pos = self.handle_inheritance(pos)
             result["inheritance"] = inheritance
             body, pos = self.handle_block_body(pos)
+        else:
+            raise ParseErrorException("Parse Error, unexpected {0} after {1}".format(word, result["name"]))
 
         result["body"] = body
 
@@ -606,6 +639,7 @@ class SolidityParser(object):
     def handle_contract(self, pos):
         result = {}
         result["type"] = "contract"
+        self.unit = result
 
         word, pos = self.get_one_word(pos)
         result["name"] = word
@@ -618,19 +652,49 @@ class SolidityParser(object):
             inheritance, pos = self.handle_inheritance(pos)
             result["inheritance"] = inheritance
             body, pos = self.handle_block_body(pos)
+        else:
+            raise ParseErrorException("Parse Error, unexpected {0} after {1}".format(word, result["name"]))
 
         result["body"] = body
 
         return result, pos
 
+    def count_token(self, count=1):
+        self.tokens += count
+        if self.limits.max_tokens is not None and self.tokens > self.limits.max_tokens:
+            raise ParseLimitException("Token count exceeds {0}".format(self.limits.max_tokens))
+        if self.deadline is not None and self.tokens % self.DEADLINE_CHECK_INTERVAL < count:
+            self.check_deadline()
+
+    def check_deadline(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ParseLimitException("Time budget of {0}s exceeded".format(self.limits.time_budget))
+
+    def skip_spaces(self, pos):
+        end = len(self.content)
+        while pos < end and self.content[pos] == ' ':
+            pos += 1
+        if pos >= end:
+            raise ParseErrorException("Unexpected end of input!")
+
+        return pos
+
+    def read_word_end(self, pos):
+        end = len(self.content)
+        while pos < end and not self.is_terminator(self.content[pos]):
+            pos += 1
+        if pos >= end:
+            raise ParseErrorException("Unexpected end of input!")
+
+        return pos
+
     def get_one_word(self, pos):
+        self.count_token()
+        pos = self.skip_spaces(pos)
         start = pos
-        while self.content[pos] == ' ':
-            pos += 1
-            start = pos
 
         if self.content[pos] == self.EF:
-            return self.content[pos], pos
+            raise ParseErrorException("Unexpected end of input at {0}".format(pos))
         if self.content[pos] == ";":
             return self.content[pos], pos + 1
         if self.content[pos] == ",":
@@ -638,18 +702,14 @@ class SolidityParser(object):
         if self.is_limiter(self.content[pos]):
             return self.content[pos], pos + 1
         else:
-            while not self.is_terminator(self.content[pos]):
-                # print(self.content[pos])
-                pos += 1
+            pos = self.read_word_end(pos)
             return self.content[start:pos], pos
 
     def try_next_word(self, pos):
+        pos = self.skip_spaces(pos)
         start = pos
-        while self.content[pos] == ' ':
-            pos += 1
-            start = pos
 
-        if self.content[pos] == "$":
+        if self.content[pos] == self.EF:
             return self.content[pos]
         if self.content[pos] == ";":
             return self.content[pos]
@@ -658,17 +718,14 @@ class SolidityParser(object):
         if self.is_limiter(self.content[pos]):
             return self.content[pos]
         else:
-            while not self.is_terminator(self.content[pos]):
-                # print(self.content[pos])
-                pos += 1
+            pos = self.read_word_end(pos)
             return self.content[start:pos]
 
     def read_until_stop(self, pos, stop, stack_depth):
         depth = stack_depth
+        pos = self.skip_spaces(pos)
         start = pos
-        while self.content[pos] == ' ':
-            pos += 1
-            start = pos
+        end = len(self.content)
 
         while self.content[pos] != stop or self.stack.depth() != depth:
             if self.content[pos] == "(":
@@ -694,43 +751,142 @@ class SolidityParser(object):
                     self.stack.pop()
 
             pos += 1
+            if pos >= end:
+                raise ParseErrorException("Unexpected end of input, missing '{0}'".format(stop))
 
         return self.content[start:pos], pos
 
     def get_one_sentence(self, pos):
+        pos = self.skip_spaces(pos)
         start = pos
-        while self.content[pos] == ' ':
-            pos += 1
-            start = pos
 
         if self.content[pos] == "}":
             return None, pos + 1
         else:
-            while self.content[pos] != ";":
-                # print(self.content[pos])
-                pos += 1
+            pos = self.content.find(";", pos)
+            if pos == -1:
+                raise ParseErrorException("Unexpected end of input, missing ';'")
             return self.content[start:pos + 1], pos + 1
 
+    def find_unit_end(self, pos):
+        # a cheap brace scan that skips string literals; returns the end and
+        # the number of braces seen, or None when it can not find the end
+        pos = self.content.find("{", pos)
+        if pos == -1:
+            return None, 0
+
+        depth = 0
+        braces = 0
+        end = len(self.content)
+        while pos < end:
+            if pos % self.SCAN_DEADLINE_INTERVAL == 0:
+                self.check_deadline()
+            c = self.content[pos]
+            if c == '"' or c == "'":
+                pos += 1
+                while pos < end and self.content[pos] != c:
+                    if self.content[pos] == "\\":
+                        pos += 1
+                    pos += 1
+            elif c == "{":
+                depth += 1
+                braces += 1
+            elif c == "}":
+                depth -= 1
+                braces += 1
+                if depth == 0:
+                    return pos + 1, braces
+            pos += 1
+
+        return None, braces
+
+    def emit(self, kind, node):
+        if self.unit is not None and self.members is not None:
+            self.members.append((kind, node))
+        if self.pipeline is not None:
+            # hash now so streamed members look like replayed ones
+            if "hash" not in node:
+                node["hash"] = StructuralHash.digest(node)
+            self.pipeline.emit(kind, node, self.unit)
+
+    def parse_unit(self, word, handler, pos):
+        if self.unit_cache is None or not self.prescan or word not in self.CACHEABLE_UNITS:
+            result, pos = handler(pos)
+            StructuralHash.annotate(result)
+        else:
+            end, braces = self.find_unit_end(pos)
+            raw_digest = None
+            cached = None
+            if end is not None:
+                raw = (word + self.content[pos:end]).encode('utf-8')
+                raw_digest = hashlib.sha256(raw).hexdigest()
+                cached = self.unit_cache.get(raw_digest)
+            if cached is not None:
+                result, members = cached
+                pos = end
+                # the braces stand in for the tokens the handler did not read
+                self.count_token(braces)
+                # the body was not parsed, replay its members instead
+                if self.pipeline is not None:
+                    self.pipeline.replay(result, members)
+            else:
+                self.members = []
+                result, pos = handler(pos)
+                StructuralHash.annotate(result)
+                # only cache when the scan agrees with what the handler
+                # consumed, otherwise a later hit would return the wrong span.
+                # A scan that disagrees may have run past the unit, stop
+                # scanning for the rest of the input to stay linear
+                if raw_digest is not None and pos == end:
+                    self.unit_cache[raw_digest] = (result, self.members)
+                else:
+                    self.prescan = False
+                self.members = None
+
+        self.unit = None
+        self.emit(word, result)
+        return result, pos
+
     def parse(self):
         result_list = []
         pos = 0
 
-        while self.content[pos] != self.EF:
-            # get one word
-            word, pos = self.get_one_word(pos)
+        # for callers building SolidityParser directly, parse_source checks
+        # the raw input before trimming; the appended end flag does not count
+        max_input_size = self.limits.max_input_size
+        if max_input_size is not None:
+            size = len(self.content)
+            if self.content.endswith(' ' + self.EF):
+                size -= len(self.EF) + 1
+            if size > max_input_size:
+                raise ParseLimitException("Input size {0} exceeds {1}".format(size, max_input_size))
+
+        self.stack = Stack(self.limits.max_depth)
+        self.tokens = 0
+        self.prescan = True
+        if self.limits.time_budget is not None:
+            self.deadline = time.monotonic() + self.limits.time_budget
+        else:
+            self.deadline = None
+
+        while True:
+            pos = self.skip_spaces(pos)
 
             # parse over
-            if word == self.EF:
+            if self.content[pos] == self.EF:
                 break
 
+            # get one word
+            word, pos = self.get_one_word(pos)
+
             handler = None
             for block in self.blocks:
                 if word == block.key_word:
-                    handler = block.handler
+                    handler = getattr(self, block.handler)
                     break
 
             if handler != None:
-                result, pos = block.handler(pos)
+                result, pos = self.parse_unit(word, handler, pos)
                 result_list.append(result)
             else:
                 # print("Can't handle current block!")
@@ -739,8 +895,53 @@ class SolidityParser(object):
         return result_list
 
 
+class ParserConfig(object):
+    # immutable keyword and type tables, shared by every parse
+    def __init__(self):
+        self.reserve_words = frozenset(["pragma", "library", "contract", "is",
+                                        "function", "event", "emit", "modifier",
+                                        "return", "public", "private", "const",
+                                        "external", "internal", "payable", "assert",
+                                        "require", "throw", "import", "as",
+                                        "indexed", "pure", "view", "memory",
+                                        "storage", "calldata", "constant"])
+        self.limiter = frozenset(["(", ")", "{", "}", "[", "]"])
+        self.operations = frozenset(["==", "!=", "=", "+",
+                                     "-", "*", "/", "**"])
+        self.types = frozenset(['address', 'bool', 'string', 'var', 'int', 'int8',
+                                'int16', 'int24', 'int32', 'int40', 'int48', 'int56',
+                                'int64', 'int72', 'int80', 'int88', 'int96', 'int104',
+                                'int112', 'int120', 'int128', 'int136', 'int144', 'int152',
+                                'int160', 'int168', 'int176', 'int184', 'int192', 'int200',
+                                'int208', 'int216', 'int224', 'int232', 'int240', 'int248',
+                                'int256', 'uint', 'uint8', 'uint16', 'uint24', 'uint32',
+                                'uint40', 'uint48', 'uint56', 'uint64', 'uint72', 'uint80',
+                                'uint88', 'uint96', 'uint104', 'uint112', 'uint120',
+                                'uint128', 'uint136', 'uint144', 'uint152', 'uint160',
+                                'uint168', 'uint176', 'uint184', 'uint192', 'uint200',
+                                'uint208', 'uint216', 'uint224', 'uint232', 'uint240',
+                                'uint248', 'uint256','byte', 'bytes', 'bytes1', 'bytes2',
+                                'bytes3', 'bytes4', 'bytes5', 'bytes6', 'bytes7', 'bytes8',
+                                'bytes9', 'bytes10', 'bytes11', 'bytes12', 'bytes13',
+                                'bytes14', 'bytes15', 'bytes16', 'bytes17', 'bytes18',
+                                'bytes19', 'bytes20', 'bytes21', 'bytes22', 'bytes23',
+                                'bytes24', 'bytes25', 'bytes26', 'bytes27', 'bytes28',
+                                'bytes29', 'bytes30', 'bytes31', 'bytes32'])
+        # handlers are method names, looked up on the parser so that
+        # subclasses can override them
+        self.blocks = (Block("pragma", "handle_pragma"),
+                       Block("import", "handle_import"),
+                       Block("library", "handle_library"),
+                       Block("interface", "handle_interface"),
+                       Block("contract", "handle_contract"))
+
+
+DEFAULT_CONFIG = ParserConfig()
+
+
 class Trim(object):
-    COMMENT_RX = re.compile("(?<!:)\\/\\/.*|\\/\\*(\\s|.)*?\\*\\/", re.MULTILINE)
+    COMMENT_START_RX = re.compile("(?<!:)\\/\\/|\\/\\*")
+    LINE_COMMENT_RX = re.compile("(?<!:)\\/\\/")
     SPACE_RX = re.compile('[\n\r$\s]+', re.MULTILINE)
 
     @classmethod
@@ -749,4 +950,522 @@ class Trim(object):
 
     @classmethod
     def strip_comments(cls, content):
-        return cls.COMMENT_RX.sub('', content)
+        # scan with str.find instead of a single backtracking regex so that
+        # unterminated or nested-looking comments stay linear in time
+        result = []
+        pos = 0
+        block_closable = True
+        while True:
+            if block_closable:
+                match = cls.COMMENT_START_RX.search(content, pos)
+            else:
+                match = cls.LINE_COMMENT_RX.search(content, pos)
+            if match is None:
+                break
+
+            start = match.start()
+            if match.group() == "//":
+                end = content.find("\n", start)
+                if end == -1:
+                    end = len(content)
+            else:
+                end = content.find("*/", start + 2)
+                if end == -1:
+                    # no "*/" left anywhere, so no later "/*" can close either
+                    block_closable = False
+                    result.append(content[pos:start + 1])
+                    pos = start + 1
+                    continue
+                end += 2
+
+            result.append(content[pos:start])
+            pos = end
+
+        result.append(content[pos:])
+        return ''.join(result)
+
+
+def parse_source(content, EF="$", limits=None, unit_cache=None, config=None,
+                 pipeline=None):
+    # check the raw size before trimming does any work on it
+    if limits is not None and limits.max_input_size is not None:
+        if len(content) > limits.max_input_size:
+            raise ParseLimitException("Input size {0} exceeds {1}".format(len(content), limits.max_input_size))
+
+    content = Trim.strip_comments(content)
+    content = Trim.strip_spaces(content)
+    content = content + ' ' + EF
+    parser = SolidityParser(content, EF, limits, unit_cache, config, pipeline)
+    return parser.parse()
+
+
+def parse_file(path, EF="$", limits=None, unit_cache=None, config=None,
+               pipeline=None):
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return parse_source(content, EF, limits, unit_cache, config, pipeline)
+
+
+def parse_files(paths, workers=None, EF="$", limits=None, unit_cache=None, config=None):
+    # every file gets its own SolidityParser, threads only share the
+    # read-only config and unit_cache, whose racing writes store equal values
+    def work(path):
+        try:
+            return path, parse_file(path, EF, limits, unit_cache, config), None
+        except Exception as e:
+            # one bad file must not lose the rest of the batch
+            return path, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(work, paths))
+
+
+class StructuralDiff(object):
+    MEMBER_KINDS = ["functions", "variables", "usings", "mappings",
+                    "events", "modifiers", "structs", "enums"]
+
+    @classmethod
+    def unit_key(cls, unit):
+        if unit["type"] == "pragma":
+            return ("pragma", unit["content"])
+        if unit["type"] == "import":
+            return ("import", unit["from"])
+        return (unit["type"], unit["name"])
+
+    @classmethod
+    def member_key(cls, kind, member):
+        name = member.get("name")
+        if kind == "functions":
+            # overloads share a name, tell them apart by parameter types
+            types = [p["type"] for p in member.get("parameters", [])]
+            return (name, tuple(types))
+        return (name, ())
+
+    @classmethod
+    def members(cls, unit):
+        result = {}
+        body = unit.get("body") or {}
+        for kind in cls.MEMBER_KINDS:
+            for member in body.get(kind, []):
+                result[(kind,) + cls.member_key(kind, member)] = member
+        if "constructor" in body:
+            result[("constructor", "constructor", ())] = body["constructor"]
+        return result
+
+    @classmethod
+    def header(cls, unit):
+        return dict((k, v) for k, v in unit.items() if k != "body" and k != "hash")
+
+    @classmethod
+    def units(cls, result_list):
+        result = {}
+        for unit in result_list or []:
+            result[cls.unit_key(unit)] = unit
+        return result
+
+    @classmethod
+    def change(cls, op, unit_key, member_key=None):
+        result = {"op": op, "unit_type": unit_key[0], "unit": unit_key[1]}
+        if member_key is not None:
+            result["kind"] = member_key[0]
+            result["name"] = member_key[1]
+            if len(member_key[2]) > 0:
+                result["parameters"] = list(member_key[2])
+        return result
+
+    @classmethod
+    def diff(cls, old, new):
+        changes = []
+        old_units = cls.units(old)
+        new_units = cls.units(new)
+
+        for key in old_units:
+            if key not in new_units:
+                changes.append(cls.change("removed", key))
+        for key, unit in new_units.items():
+            if key not in old_units:
+                changes.append(cls.change("added", key))
+                continue
+            old_unit = old_units[key]
+            if old_unit.get("hash") == unit.get("hash"):
+                continue
+
+            # the unit header itself, e.g. inheritance
+            if cls.header(old_unit) != cls.header(unit):
+                changes.append(cls.change("changed", key))
+
+            old_members = cls.members(old_unit)
+            new_members = cls.members(unit)
+            for member_key in old_members:
+                if member_key not in new_members:
+                    changes.append(cls.change("removed", key, member_key))
+            for member_key, member in new_members.items():
+                if member_key not in old_members:
+                    changes.append(cls.change("added", key, member_key))
+                elif old_members[member_key] != member:
+                    changes.append(cls.change("changed", key, member_key))
+
+        return changes
+
+
+class StructuralHash(object):
+    @classmethod
+    def digest(cls, node):
+        data = json.dumps(node, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def members(cls, unit):
+        body = unit.get("body") or {}
+        for kind in StructuralDiff.MEMBER_KINDS:
+            for member in body.get(kind, []):
+                yield member
+        if "constructor" in body:
+            yield body["constructor"]
+
+    @classmethod
+    def skeleton(cls, unit):
+        # the unit with every member replaced by its hash
+        result = dict((k, v) for k, v in unit.items() if k != "body" and k != "hash")
+        if "body" in unit:
+            body = {}
+            for kind, value in unit["body"].items():
+                if kind == "constructor":
+                    body[kind] = value["hash"]
+                else:
+                    body[kind] = [member["hash"] for member in value]
+            result["body"] = body
+
+        return result
+
+    @classmethod
+    def annotate(cls, unit):
+        # members are hashed first so the unit hash is a hash of member hashes;
+        # members already hashed when they were emitted keep that hash
+        for member in cls.members(unit):
+            if "hash" not in member:
+                member["hash"] = cls.digest(member)
+        unit["hash"] = cls.digest(cls.skeleton(unit))
+
+        return unit["hash"]
+
+
+class SubtreeStore(object):
+    def __init__(self):
+        self.units = {}      # structural hash -> unit skeleton
+        self.members = {}    # structural hash -> member
+        self.files = {}      # path -> [unit hash]
+        self.unit_cache = {} # raw text hash -> (parsed unit, members), see SolidityParser
+
+    def parse(self, path, content, EF="$", limits=None):
+        result_list = parse_source(content, EF, limits, self.unit_cache)
+        self.add(path, result_list)
+        return result_list
+
+    def add(self, path, result_list):
+        hashes = []
+        for unit in result_list:
+            if "hash" not in unit:
+                StructuralHash.annotate(unit)
+            if unit["hash"] not in self.units:
+                self.units[unit["hash"]] = StructuralHash.skeleton(unit)
+                for member in StructuralHash.members(unit):
+                    self.members.setdefault(member["hash"], member)
+            hashes.append(unit["hash"])
+
+        self.files[path] = hashes
+        return hashes
+
+    def get_unit(self, unit_hash):
+        skeleton = self.units[unit_hash]
+        result = dict((k, v) for k, v in skeleton.items() if k != "body")
+        if "body" in skeleton:
+            body = {}
+            for kind, value in skeleton["body"].items():
+                if kind == "constructor":
+                    body[kind] = self.members[value]
+                else:
+                    body[kind] = [self.members[h] for h in value]
+            result["body"] = body
+        result["hash"] = unit_hash
+
+        return result
+
+    def get(self, path):
+        return [self.get_unit(h) for h in self.files[path]]
+
+
+class Extractor(object):
+    # subclasses define on_<kind>(node, unit) for the kinds they care about,
+    # see ExtractorPipeline.KINDS; unit is the enclosing library, interface
+    # or contract (still being parsed) or None for top-level nodes
+    def result(self):
+        return None
+
+
+class ExtractorPipeline(object):
+    KINDS = ["pragma", "import", "library", "interface", "contract",
+             "function", "variable", "using", "mapping", "event",
+             "modifier", "struct", "enum", "constructor"]
+
+    def __init__(self, extractors=None):
+        self.extractors = []
+        self.callbacks = {}
+        for extractor in extractors or []:
+            self.add(extractor)
+
+    def register(self, kind, callback):
+        if kind not in self.KINDS:
+            raise ValueError("Unknown node kind {0}".format(kind))
+        self.callbacks.setdefault(kind, []).append(callback)
+
+    def add(self, extractor):
+        self.extractors.append(extractor)
+        for kind in self.KINDS:
+            callback = getattr(extractor, "on_" + kind, None)
+            if callback is not None:
+                self.register(kind, callback)
+
+    def emit(self, kind, node, unit):
+        for callback in self.callbacks.get(kind, []):
+            callback(node, unit)
+
+    def replay(self, unit, members):
+        # members is the (kind, member) list recorded in source order; the
+        # enclosing unit is shown as it looked while its body was parsed
+        header = dict((k, v) for k, v in unit.items() if k != "body" and k != "hash")
+        for kind, member in members:
+            self.emit(kind, member, header)
+
+    def results(self):
+        return [extractor.result() for extractor in self.extractors]
+
+
+class CorpusJob(object):
+    # a resumable corpus run backed by a SQLite work queue; several worker
+    # processes, on one box or on machines sharing the file, claim batches
+    # of pending files and record each result as soon as it is parsed
+    SCHEMA = """CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    claimed_at REAL,
+                    finished_at REAL,
+                    error TEXT,
+                    result TEXT);
+                CREATE INDEX IF NOT EXISTS files_status ON files (status)"""
+
+    def __init__(self, db_path, EF="$", limits=None, lease=600.0, max_attempts=3):
+        self.db_path = db_path
+        self.EF = EF
+        self.limits = limits
+        self.lease = lease    # seconds before a claimed file counts as abandoned
+        self.max_attempts = max_attempts
+        # pids are reused after a reboot, the random part keeps a new worker
+        # from taking over (and renewing) a dead worker's leases
+        self.worker = "{0}:{1}:{2}".format(socket.gethostname(), os.getpid(), uuid.uuid4().hex[:12])
+        self.db = sqlite3.connect(db_path, timeout=60.0, isolation_level=None)
+        self.db.executescript(self.SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add(self, paths):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.executemany("INSERT OR IGNORE INTO files (path) VALUES (?)",
+                                [(path,) for path in paths])
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def claim(self, batch_size):
+        # running files whose lease expired belong to a crashed worker
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            # a file that keeps killing its worker is given up on
+            self.db.execute("UPDATE files SET status = 'failed', finished_at = ?, "
+                            "error = 'Abandoned after ' || attempts || ' attempts' "
+                            "WHERE status = 'running' AND claimed_at < ? AND attempts >= ?",
+                            (now, now - self.lease, self.max_attempts))
+            rows = self.db.execute("SELECT path FROM files WHERE status = 'pending' "
+                                   "OR (status = 'running' AND claimed_at < ?) "
+                                   "ORDER BY path LIMIT ?",
+                                   (now - self.lease, batch_size)).fetchall()
+            paths = [row[0] for row in rows]
+            self.db.executemany("UPDATE files SET status = 'running', worker = ?, "
+                                "claimed_at = ? WHERE path = ?",
+                                [(self.worker, now, path) for path in paths])
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+
+        return paths
+
+    def start(self, path):
+        # renew the lease on every file this worker still holds, so the tail
+        # of a slow batch is not reclaimed, and count the attempt on this one
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.execute("UPDATE files SET claimed_at = ? WHERE worker = ? AND status = 'running'",
+                            (time.time(), self.worker))
+            cursor = self.db.execute("UPDATE files SET attempts = attempts + 1 "
+                                     "WHERE path = ? AND worker = ? AND status = 'running'",
+                                     (path, self.worker))
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+
+        return cursor.rowcount == 1
+
+    def finish(self, path, result, error):
+        status = "failed" if error is not None else "done"
+        result = json.dumps(result) if result is not None else None
+        self.db.execute("UPDATE files SET status = ?, finished_at = ?, error = ?, "
+                        "result = ? WHERE path = ? AND worker = ?",
+                        (status, time.time(), error, result, path, self.worker))
+
+    def retry_failed(self):
+        cursor = self.db.execute("UPDATE files SET status = 'pending', error = NULL, "
+                                 "attempts = 0 WHERE status = 'failed'")
+        return cursor.rowcount
+
+    def progress(self):
+        result = {"pending": 0, "running": 0, "done": 0, "failed": 0}
+        for status, count in self.db.execute("SELECT status, COUNT(*) FROM files GROUP BY status"):
+            result[status] = count
+        return result
+
+    def results(self):
+        for path, result in self.db.execute("SELECT path, result FROM files "
+                                            "WHERE status = 'done' ORDER BY path"):
+            yield path, json.loads(result)
+
+    def errors(self):
+        for row in self.db.execute("SELECT path, error FROM files "
+                                   "WHERE status = 'failed' ORDER BY path"):
+            yield row
+
+    def run(self, batch_size=50, report=None, unit_cache=None):
+        started = time.time()
+        parsed = 0
+
+        while True:
+            paths = self.claim(batch_size)
+            if len(paths) == 0:
+                break
+
+            for path in paths:
+                if not self.start(path):
+                    # the lease expired and another worker took the file
+                    continue
+                try:
+                    result = parse_file(path, self.EF, self.limits, unit_cache)
+                    self.finish(path, result, None)
+                except Exception as e:
+                    # record the failure, the rest of the batch still runs
+                    self.finish(path, None, str(e))
+                parsed += 1
+
+            if report is not None:
+                progress = self.progress()
+                elapsed = time.time() - started
+                progress["worker"] = self.worker
+                progress["parsed"] = parsed
+                progress["files_per_second"] = parsed / elapsed if elapsed > 0 else 0.0
+                report(progress)
+
+        return parsed
+
+
+class WatchedFile(object):
+    def __init__(self, mtime, size, digest, result):
+        self.mtime = mtime
+        self.size = size
+        self.digest = digest
+        self.result = result
+
+
+class Watcher(object):
+    def __init__(self, root, EF="$", limits=None, suffix=".sol"):
+        self.root = root
+        self.EF = EF
+        self.limits = limits
+        self.suffix = suffix
+        self.files = {}
+
+    def scan(self):
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(self.suffix):
+                    paths.append(os.path.join(dirpath, filename))
+
+        return sorted(paths)
+
+    def poll_file(self, path):
+        # the file may vanish between scan, stat and read while an editor saves
+        watched = self.files.get(path)
+        try:
+            stat = os.stat(path)
+            if watched is not None and watched.mtime == stat.st_mtime_ns and watched.size == stat.st_size:
+                return []
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()
+        if watched is not None and watched.digest == digest:
+            # touched but not edited
+            watched.mtime = stat.st_mtime_ns
+            watched.size = stat.st_size
+            return []
+
+        old = watched.result if watched is not None else None
+        try:
+            result = parse_source(data.decode('utf-8'), self.EF, self.limits)
+        except Exception as e:
+            # keep the last good result so the next successful parse diffs against it
+            if watched is not None:
+                watched.mtime = stat.st_mtime_ns
+                watched.size = stat.st_size
+                watched.digest = digest
+            else:
+                self.files[path] = WatchedFile(stat.st_mtime_ns, stat.st_size, digest, None)
+            return [{"op": "error", "message": str(e)}]
+
+        self.files[path] = WatchedFile(stat.st_mtime_ns, stat.st_size, digest, result)
+        return StructuralDiff.diff(old, result)
+
+    def poll(self):
+        changes = []
+        paths = self.scan()
+
+        for path in paths:
+            file_changes = self.poll_file(path)
+            if file_changes is None:
+                continue
+            for change in file_changes:
+                change["file"] = path
+                changes.append(change)
+
+        for path in set(self.files) - set(paths):
+            watched = self.files.pop(path)
+            for change in StructuralDiff.diff(watched.result, None):
+                change["file"] = path
+                changes.append(change)
+
+        return changes
+
+    def watch(self, callback, interval=1.0):
+        while True:
+            changes = self.poll()
+            if len(changes) > 0:
+                callback(changes)
+            time.sleep(interval)
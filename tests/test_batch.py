@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from solidity_parser import (DEFAULT_CONFIG, ParseErrorException, ParserConfig,
+                             SolidityParser, Trim, parse_file, parse_files)
+
+SOURCES = [
+    "library SafeMath { function add(uint a, uint b) internal pure returns (uint) { return a + b; } }",
+    "contract Ownable { address owner; modifier onlyOwner() { require(msg.sender == owner); _; } }",
+    "library SafeMath { function add(uint a, uint b) internal pure returns (uint) { return a + b; } }"
+    " contract Token is Ownable { uint total; }",
+    "contract Broken ;",
+    "contract Ownable { address owner; modifier onlyOwner() { require(msg.sender == owner); _; } }",
+]
+
+
+def write_sources(tmp_path):
+    paths = []
+    for i, source in enumerate(SOURCES):
+        path = str(tmp_path / "{0}.sol".format(i))
+        with open(path, 'w') as f:
+            f.write(source)
+        paths.append(path)
+    return paths
+
+
+def test_parse_files_keeps_order_and_isolates_errors(tmp_path):
+    paths = write_sources(tmp_path)
+    results = parse_files(paths, workers=4)
+
+    assert [path for path, result, error in results] == paths
+    for path, result, error in results:
+        if path.endswith("3.sol"):
+            assert result is None
+            assert "Broken" in error
+        else:
+            assert error is None
+            assert result == parse_file(path)
+
+
+def test_shared_unit_cache_matches_separate_parses(tmp_path):
+    paths = write_sources(tmp_path)
+    separate = parse_files(paths, workers=4)
+    shared = parse_files(paths, workers=4, unit_cache={})
+    assert shared == separate
+
+
+def test_config_is_shared_between_parsers():
+    first = SolidityParser(" $", "$")
+    second = SolidityParser(" $", "$")
+    assert first.config is second.config is DEFAULT_CONFIG
+    assert first.types is DEFAULT_CONFIG.types
+    assert "uint256" in ParserConfig().types
+
+
+def test_subclass_handler_override():
+    class NoContracts(SolidityParser):
+        def handle_contract(self, pos):
+            raise ParseErrorException("contracts are not allowed")
+
+    content = Trim.strip_spaces("contract A { }") + " $"
+    assert SolidityParser(content, "$").parse()[0]["name"] == "A"
+    with pytest.raises(ParseErrorException):
+        NoContracts(content, "$").parse()
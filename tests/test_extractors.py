@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from solidity_parser import Extractor, ExtractorPipeline, parse_source
+
+SOURCE = ("contract C { uint a; mapping(address => uint) m; uint constant C = 1; "
+          "uint b; function f() public {} }")
+
+
+class Recorder(Extractor):
+    def __init__(self):
+        self.nodes = []
+
+    def record(self, node, unit):
+        self.nodes.append((node.get("name"), sorted(node), sorted(unit)))
+
+    def on_variable(self, node, unit):
+        self.record(node, unit)
+
+    def on_mapping(self, node, unit):
+        self.record(node, unit)
+
+    def on_function(self, node, unit):
+        self.record(node, unit)
+
+    def result(self):
+        return self.nodes
+
+
+def test_members_in_source_order():
+    recorder = Recorder()
+    parse_source(SOURCE, pipeline=ExtractorPipeline([recorder]))
+    assert [name for name, keys, unit in recorder.result()] == ["a", "m", "C", "b", "f"]
+
+
+def test_cache_hit_replays_like_a_fresh_parse():
+    cache = {}
+    results = []
+    for i in range(2):
+        recorder = Recorder()
+        parse_source(SOURCE, unit_cache=cache, pipeline=ExtractorPipeline([recorder]))
+        results.append(recorder.result())
+    assert results[0] == results[1]
+
+
+def test_constant_is_a_modifier():
+    variables = parse_source(SOURCE)[0]["body"]["variables"]
+    assert variables[1]["name"] == "C"
+    assert "constant" in variables[1]["modifiers"]
+
+
+def test_members_hashed_once_with_pipeline(monkeypatch):
+    import solidity_parser
+    calls = []
+    digest = solidity_parser.StructuralHash.digest.__func__
+
+    def counting_digest(cls, node):
+        calls.append(node)
+        return digest(cls, node)
+
+    monkeypatch.setattr(solidity_parser.StructuralHash, "digest", classmethod(counting_digest))
+    with_pipeline = parse_source(SOURCE, pipeline=ExtractorPipeline([Recorder()]))
+    hashed_with_pipeline = len(calls)
+    del calls[:]
+    without_pipeline = parse_source(SOURCE)
+    assert hashed_with_pipeline == len(calls)
+    assert with_pipeline == without_pipeline
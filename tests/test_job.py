@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import solidity_parser
+from solidity_parser import CorpusJob
+
+GOOD = "contract A { uint x; function f() public {} }"
+BAD = "contract A ;"
+
+
+def make_job(tmp_path, sources, **kwargs):
+    paths = []
+    for i, source in enumerate(sources):
+        path = str(tmp_path / "{0}.sol".format(i))
+        with open(path, 'w') as f:
+            f.write(source)
+        paths.append(path)
+    db_path = str(tmp_path / "job.db")
+    job = CorpusJob(db_path, **kwargs)
+    job.add(paths)
+    return job, db_path, paths
+
+
+def expire(job):
+    job.db.execute("UPDATE files SET claimed_at = claimed_at - ?", (job.lease + 1,))
+
+
+def test_run_records_results(tmp_path):
+    job, db_path, paths = make_job(tmp_path, [GOOD, BAD, GOOD])
+    assert job.run() == 3
+    assert job.progress() == {"pending": 0, "running": 0, "done": 2, "failed": 1}
+    assert [path for path, result in job.results()] == [paths[0], paths[2]]
+    assert [path for path, error in job.errors()] == [paths[1]]
+
+
+def test_worker_ids_are_unique(tmp_path):
+    job, db_path, paths = make_job(tmp_path, [GOOD])
+    assert CorpusJob(db_path).worker != job.worker
+
+
+def test_abandoned_claim_is_reclaimed_after_lease(tmp_path):
+    dead, db_path, paths = make_job(tmp_path, [GOOD, GOOD])
+    assert dead.claim(10) == paths
+    assert dead.start(paths[0])
+
+    worker = CorpusJob(db_path)
+    assert worker.claim(10) == []
+    expire(dead)
+    assert worker.run() == 2
+    assert worker.progress()["done"] == 2
+
+
+def test_late_finish_from_old_owner_is_ignored(tmp_path):
+    dead, db_path, paths = make_job(tmp_path, [GOOD])
+    dead.claim(10)
+    expire(dead)
+    worker = CorpusJob(db_path)
+    worker.run()
+
+    dead.finish(paths[0], None, "late")
+    assert worker.progress() == {"pending": 0, "running": 0, "done": 1, "failed": 0}
+    assert not dead.start(paths[0])
+
+
+def test_max_attempts_marks_file_failed(tmp_path):
+    job, db_path, paths = make_job(tmp_path, [GOOD], max_attempts=2)
+    for i in range(2):
+        worker = CorpusJob(db_path, max_attempts=2)
+        assert worker.claim(10) == paths
+        assert worker.start(paths[0])
+        expire(worker)
+
+    assert CorpusJob(db_path, max_attempts=2).claim(10) == []
+    errors = list(job.errors())
+    assert errors == [(paths[0], "Abandoned after 2 attempts")]
+
+
+def test_retry_failed_requeues_only_failures(tmp_path):
+    job, db_path, paths = make_job(tmp_path, [GOOD, BAD])
+    job.run()
+    assert job.retry_failed() == 1
+    assert job.progress() == {"pending": 1, "running": 0, "done": 1, "failed": 0}
+    assert job.claim(10) == [paths[1]]
+
+
+def test_exception_does_not_lose_batch(tmp_path, monkeypatch):
+    job, db_path, paths = make_job(tmp_path, [GOOD, GOOD, GOOD])
+    parse_file = solidity_parser.parse_file
+
+    def exploding_parse_file(path, *args):
+        if path == paths[1]:
+            raise RuntimeError("boom")
+        return parse_file(path, *args)
+
+    monkeypatch.setattr(solidity_parser, "parse_file", exploding_parse_file)
+    assert job.run(batch_size=10) == 3
+    assert job.progress() == {"pending": 0, "running": 0, "done": 2, "failed": 1}
+    assert list(job.errors()) == [(paths[1], "boom")]
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import os
+import re
+import sys
+import time
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from solidity_parser import (Trim, ParseLimits, ParseErrorException,
+                             ParseLimitException, parse_source)
+
+# the regex strip_comments replaced, exponential on unterminated comments
+OLD_COMMENT_RX = re.compile("(?<!:)\\/\\/.*|\\/\\*(\\s|.)*?\\*\\/", re.MULTILINE)
+
+SOURCE = """pragma solidity ^0.4.24;
+contract Token {
+    uint256 public total;
+    function f(uint a) public returns (uint) { if (a > 0) { return (a); } return 1; }
+}
+"""
+
+
+def best_time(func, arg, repeat=3):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def assert_linear(func, make_input, n):
+    # 8x the input must cost well under the 64x a quadratic scan would
+    small = best_time(func, make_input(n))
+    large = best_time(func, make_input(8 * n))
+    assert large < 24 * max(small, 1e-4)
+
+
+def parse_or_error(content):
+    try:
+        parse_source(content)
+    except ParseErrorException:
+        pass
+
+
+def test_strip_comments_matches_old_regex():
+    rng = random.Random(1)
+    for i in range(200000):
+        content = ''.join(rng.choice('/*:\n a') for j in range(rng.randint(0, 16)))
+        assert Trim.strip_comments(content) == OLD_COMMENT_RX.sub('', content)
+
+
+@pytest.mark.parametrize("make_input", [
+    lambda n: "/*" * n,
+    lambda n: "/*" + " " * n,
+    lambda n: "//" * n,
+    lambda n: "/* */" * n,
+    lambda n: "http://x /*" * n,
+])
+def test_strip_comments_linear(make_input):
+    assert_linear(Trim.strip_comments, make_input, 20000)
+
+
+@pytest.mark.parametrize("content", [
+    "contract A { uint x = 1",
+    "contract A { function f() { (((",
+    "contract A { event E(",
+    "contract A {",
+    "contract A { uint x",
+    "contract A ;",
+    "contract A { function f() ) }",
+    "pragma solidity",
+    "}}}",
+])
+def test_unterminated_input_raises_parse_error(content):
+    with pytest.raises(ParseErrorException):
+        parse_source(content)
+
+
+def test_unterminated_input_linear():
+    assert_linear(parse_or_error, lambda n: "contract A { uint x = " + "1 + " * n, 20000)
+    assert_linear(parse_or_error, lambda n: "contract A { function f() { " + "{ " * n, 20000)
+
+
+def test_deep_nesting_linear():
+    make_input = lambda n: "contract A { function f() { " + "(" * n + ")" * n + " } }"
+    assert_linear(parse_source, make_input, 20000)
+
+
+def test_unit_cache_linear():
+    # the pre-scan and the handler disagree about where these units end
+    def parse_cached(content):
+        parse_source(content, unit_cache={})
+    assert_linear(parse_cached, lambda n: "contract A { uint x = {; } " * n, 500)
+    assert_linear(parse_cached, lambda n: 'contract A { string s = "; } ' * n, 500)
+
+
+def test_token_count_linear():
+    assert_linear(parse_source, lambda n: "contract A { " + "uint x; " * n + "}", 2000)
+
+
+def test_no_limits_by_default():
+    body = parse_source(SOURCE)[1]["body"]
+    assert body["functions"][0]["name"] == "f"
+
+
+def test_max_input_size():
+    parse_source(SOURCE, limits=ParseLimits(max_input_size=len(SOURCE)))
+    with pytest.raises(ParseLimitException):
+        parse_source(SOURCE, limits=ParseLimits(max_input_size=len(SOURCE) - 1))
+
+
+def test_max_input_size_counts_comments():
+    content = "/*" + " " * 100000 + "*/ contract A { }"
+    with pytest.raises(ParseLimitException):
+        parse_source(content, limits=ParseLimits(max_input_size=100))
+
+
+def test_max_input_size_without_whitespace_to_trim():
+    content = "contract A{}"
+    parse_source(content, limits=ParseLimits(max_input_size=len(content)))
+    with pytest.raises(ParseLimitException):
+        parse_source(content, limits=ParseLimits(max_input_size=len(content) - 1))
+
+
+def test_max_depth():
+    parse_source(SOURCE, limits=ParseLimits(max_depth=4))
+    with pytest.raises(ParseLimitException):
+        parse_source(SOURCE, limits=ParseLimits(max_depth=3))
+
+
+def test_max_tokens():
+    parse_source(SOURCE, limits=ParseLimits(max_tokens=1000))
+    with pytest.raises(ParseLimitException):
+        parse_source(SOURCE, limits=ParseLimits(max_tokens=10))
+
+
+def test_time_budget():
+    content = "contract A { " + "uint x; " * 2000 + "}"
+    parse_source(content, limits=ParseLimits(time_budget=60.0))
+    with pytest.raises(ParseLimitException):
+        parse_source(content, limits=ParseLimits(time_budget=0.0))
+
+
+def test_limit_exception_is_parse_error():
+    assert issubclass(ParseLimitException, ParseErrorException)
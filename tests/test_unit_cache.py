@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from solidity_parser import parse_source
+
+
+def test_braces_in_strings_do_not_drop_units():
+    content = 'contract A { string s = "{"; } contract B { string t = "}"; }'
+    cache = {}
+    for i in range(3):
+        result = parse_source(content, unit_cache=cache)
+        assert [unit["name"] for unit in result] == ["A", "B"]
+
+
+def test_brace_in_string_does_not_match_other_unit():
+    cache = {}
+    parse_source('contract A { string s = "}"; function f() public {} }', unit_cache=cache)
+    result = parse_source('contract A { string s = "}"; function g() public {} }', unit_cache=cache)
+    assert result[0]["body"]["functions"][0]["name"] == "g"
+
+
+def test_cache_hit_matches_fresh_parse():
+    content = "library L { function f(uint a) internal {} } contract C is L { uint x; }"
+    cache = {}
+    first = parse_source(content, unit_cache=cache)
+    second = parse_source(content, unit_cache=cache)
+    assert first == second == parse_source(content)
+    assert second[0] is first[0]
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import solidity_parser
+from solidity_parser import StructuralDiff, Watcher, parse_source
+
+BASE = """contract Token is Ownable {
+    uint256 total;
+    event Transfer(address from, address to);
+    function f(uint a) public {}
+    function f(address a) public {}
+}
+"""
+
+
+def write(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def changes_of(changes):
+    return sorted((c["op"], c.get("kind"), c.get("name"), tuple(c.get("parameters", [])))
+                  for c in changes)
+
+
+def test_member_changes():
+    new = BASE.replace("uint256 total;", "uint256 supply;")
+    new = new.replace("function f(address a) public {}", "function f(address a) public view {}")
+    new = new.replace("event Transfer(address from, address to);", "")
+    new = new.replace("function f(uint a)", "function g() public {}\n    function f(uint a)")
+    changes = StructuralDiff.diff(parse_source(BASE), parse_source(new))
+    assert changes_of(changes) == [
+        ("added", "functions", "g", ()),
+        ("added", "variables", "supply", ()),
+        ("changed", "functions", "f", ("address",)),
+        ("removed", "events", "Transfer", ()),
+        ("removed", "variables", "total", ()),
+    ]
+
+
+def test_unit_header_change():
+    new = BASE.replace("is Ownable", "is Ownable, Pausable")
+    changes = StructuralDiff.diff(parse_source(BASE), parse_source(new))
+    assert changes == [{"op": "changed", "unit_type": "contract", "unit": "Token"}]
+
+
+def test_touch_without_edit(tmp_path):
+    path = str(tmp_path / "a.sol")
+    write(path, BASE)
+    watcher = Watcher(str(tmp_path))
+    assert len(watcher.poll()) == 1
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert watcher.poll() == []
+
+
+def test_error_then_fix_diffs_against_last_good(tmp_path):
+    path = str(tmp_path / "a.sol")
+    write(path, BASE)
+    watcher = Watcher(str(tmp_path))
+    watcher.poll()
+
+    write(path, "contract Token {")
+    changes = watcher.poll()
+    assert [c["op"] for c in changes] == ["error"]
+    assert changes[0]["file"] == path
+
+    write(path, BASE.replace("uint256 total;", "uint256 total; uint256 cap;"))
+    assert changes_of(watcher.poll()) == [("added", "variables", "cap", ())]
+
+
+def test_deleted_file(tmp_path):
+    path = str(tmp_path / "a.sol")
+    write(path, BASE)
+    watcher = Watcher(str(tmp_path))
+    watcher.poll()
+    os.remove(path)
+    assert watcher.poll() == [{"op": "removed", "unit_type": "contract",
+                               "unit": "Token", "file": path}]
+    assert watcher.files == {}
+
+
+def test_file_vanishing_after_scan(tmp_path, monkeypatch):
+    path = str(tmp_path / "a.sol")
+    write(path, BASE)
+    watcher = Watcher(str(tmp_path))
+    real_stat = os.stat
+
+    def vanishing_stat(target, *args, **kwargs):
+        if target == path:
+            os.remove(path)
+        return real_stat(target, *args, **kwargs)
+
+    monkeypatch.setattr(solidity_parser.os, "stat", vanishing_stat)
+    assert watcher.poll() == []
+    monkeypatch.undo()
+    assert watcher.poll() == []